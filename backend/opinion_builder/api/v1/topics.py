@@ -5,11 +5,12 @@ from datetime import datetime
 from typing import Annotated
 
 from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import ORJSONResponse
 
 from opinion_builder.config import settings
 from opinion_builder.models.error import ErrorDetail
 from opinion_builder.models.filter import TopicFilterRequest
-from opinion_builder.models.topic import TopicDetailResponse, TopicListResponse
+from opinion_builder.models.topic import Topic, TopicDetailResponse, TopicListResponse
 from opinion_builder.services.topic_service import TopicService
 
 logger = logging.getLogger(__name__)
@@ -17,6 +18,20 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/topics", tags=["topics"])
 
 
+def _topic_list_response(
+    items: list[Topic], total: int, limit: int, offset: int
+) -> ORJSONResponse:
+    """Build a topic list response without revalidating it against TopicListResponse."""
+    return ORJSONResponse(
+        {
+            "items": [t.model_dump(mode="json") for t in items],
+            "total": total,
+            "limit": limit,
+            "offset": offset,
+        }
+    )
+
+
 @router.get("", response_model=TopicListResponse)
 async def get_topics(
     request: Request,
@@ -26,8 +41,22 @@ async def get_topics(
     end_date_after: Annotated[datetime | None, Query()] = None,
     order_by: Annotated[str, Query()] = "end_date",
     order: Annotated[str, Query()] = "asc",
-) -> TopicListResponse:
-    """Get topics list with filtering and pagination."""
+    after_end_date: Annotated[datetime | None, Query()] = None,
+    after_id: Annotated[str | None, Query()] = None,
+) -> ORJSONResponse:
+    """Get topics list with filtering and pagination.
+
+    Prefer keyset pagination: pass the end_date and id of the last topic received as
+    after_end_date and after_id to get the next page; offset is then ignored.
+    """
+    if (after_end_date is not None or after_id is not None) and order_by != "end_date":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=ErrorDetail(
+                code="INVALID_PARAMETER",
+                message="after_end_date and after_id require order_by=end_date",
+            ).model_dump(),
+        )
     service = request.app.state.topic_service  # type: ignore
     items, total = await service.get_topics(
         limit=limit,
@@ -36,8 +65,10 @@ async def get_topics(
         end_date_after=end_date_after,
         order_by=order_by,
         order=order,
+        after_end_date=after_end_date,
+        after_id=after_id,
     )
-    return TopicListResponse(items=items, total=total, limit=limit, offset=offset)
+    return _topic_list_response(items, total, limit, offset)
 
 
 @router.get("/search", response_model=TopicListResponse)
@@ -46,24 +77,24 @@ async def search_topics(
     q: Annotated[str, Query(min_length=1)],
     limit: Annotated[int, Query(ge=1, le=100)] = 100,
     fuzzy: Annotated[bool, Query()] = True,
-) -> TopicListResponse:
+) -> ORJSONResponse:
     """Search topics by keyword."""
     service = request.app.state.topic_service  # type: ignore
     items = await service.search_topics(query=q, limit=limit, fuzzy=fuzzy)
-    return TopicListResponse(items=items, total=len(items), limit=limit, offset=0)
+    return _topic_list_response(items, len(items), limit, 0)
 
 
 @router.post("/filter", response_model=TopicListResponse)
 async def filter_topics(
     request: Request,
     body: TopicFilterRequest,
-) -> TopicListResponse:
+) -> ORJSONResponse:
     """Advanced filter topics."""
     service = request.app.state.topic_service  # type: ignore
     items, total = await service.filter_topics(body)
     limit = body.pagination.limit if body.pagination else settings.default_limit
     offset = body.pagination.offset if body.pagination else 0
-    return TopicListResponse(items=items, total=total, limit=limit, offset=offset)
+    return _topic_list_response(items, total, limit, offset)
 
 
 @router.get("/{topic_id}", response_model=TopicDetailResponse)
@@ -4,6 +4,7 @@ import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 
 from opinion_builder.api.v1.health import router as health_router
 from opinion_builder.api.v1.topics import router as topics_router
@@ -62,6 +63,7 @@ app = FastAPI(
     description="API for discovering and filtering prediction market topics",
     version="0.1.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Include routers
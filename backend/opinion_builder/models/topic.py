@@ -25,6 +25,9 @@ class Topic(BaseModel):
     updated_at: Optional[datetime] = Field(None, description="Last update time")
     categories: Optional[list[str]] = Field(default_factory=list, description="Category tags")
     slug: Optional[str] = Field(None, description="URL-friendly identifier")
+    # Numeric values parsed once when the cache indexes the topic
+    last_price_f: Optional[float] = Field(None, exclude=True, repr=False)
+    volume_f: Optional[float] = Field(None, exclude=True, repr=False)
 
     model_config = {"from_attributes": True}
 
@@ -2,7 +2,8 @@
 
 from enum import Enum
 
-from pydantic import BaseModel, Field
+import msgspec
+from pydantic import BaseModel
 
 
 class MessageType(str, Enum):
@@ -13,67 +14,48 @@ class MessageType(str, Enum):
     LAST_TRADE = "market.last.trade"
 
 
-class DepthDiffMessage(BaseModel):
+class _MarketMessage(msgspec.Struct, tag_field="msgType", rename="camel"):
+    """Fields shared by market channel messages, tagged by msgType."""
+
+    market_id: int
+    token_id: str
+    outcome_side: int
+
+
+class DepthDiffMessage(_MarketMessage, tag=MessageType.DEPTH_DIFF.value):
     """market.depth.diff message."""
 
-    market_id: int = Field(..., alias="marketId")
-    token_id: str = Field(..., alias="tokenId")
-    outcome_side: int = Field(..., alias="outcomeSide")
     side: str  # bids or asks
     price: str
     size: str
-    msg_type: MessageType = Field(..., alias="msgType")
 
-    model_config = {"populate_by_name": True}
 
-
-class LastPriceMessage(BaseModel):
+class LastPriceMessage(_MarketMessage, tag=MessageType.LAST_PRICE.value):
     """market.last.price message."""
 
-    market_id: int = Field(..., alias="marketId")
-    token_id: str = Field(..., alias="tokenId")
-    outcome_side: int = Field(..., alias="outcomeSide")
     price: str
-    msg_type: MessageType = Field(..., alias="msgType")
-
-    model_config = {"populate_by_name": True}
 
 
-class LastTradeMessage(BaseModel):
+class LastTradeMessage(_MarketMessage, tag=MessageType.LAST_TRADE.value):
     """market.last.trade message."""
 
-    market_id: int = Field(..., alias="marketId")
-    token_id: str = Field(..., alias="tokenId")
-    outcome_side: int = Field(..., alias="outcomeSide")
     side: str  # Buy or Sell
     price: str
     shares: str
     amount: str
-    msg_type: MessageType = Field(..., alias="msgType")
 
-    model_config = {"populate_by_name": True}
 
+# Any inbound market message, decoded by its msgType tag
+WebSocketMessage = DepthDiffMessage | LastPriceMessage | LastTradeMessage
 
-class WebSocketSubscribeMessage(BaseModel):
-    """WebSocket subscribe message."""
 
-    action: str = "SUBSCRIBE"
-    channel: str
-    market_id: int | None = Field(None, alias="marketId")
-    root_market_id: int | None = Field(None, alias="rootMarketId")
-
-    model_config = {"populate_by_name": True}
+class WebSocketSubscribeMessage(msgspec.Struct, omit_defaults=True, rename="camel"):
+    """WebSocket subscribe message, encoded with msgspec without validation."""
 
-    def to_json(self) -> str:
-        """Convert to JSON string for WebSocket send."""
-        import json
-
-        data = {"action": self.action, "channel": self.channel}
-        if self.market_id is not None:
-            data["marketId"] = self.market_id
-        if self.root_market_id is not None:
-            data["rootMarketId"] = self.root_market_id
-        return json.dumps(data)
+    action: str
+    channel: str
+    market_id: int | None = None
+    root_market_id: int | None = None
 
 
 class HealthStatus(BaseModel):
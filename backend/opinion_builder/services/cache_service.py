@@ -1,17 +1,43 @@
 """In-memory cache service for topics."""
 
 import asyncio
+import math
+import re
+from array import array
+from bisect import bisect_left
 from collections import OrderedDict
+from collections.abc import Callable, Sequence
 from datetime import datetime
 from typing import Any
 
+from rapidfuzz import fuzz, process
+from rapidfuzz.distance import Levenshtein, Prefix
+from sortedcontainers import SortedList
+
 from opinion_builder.config import settings
 from opinion_builder.models.topic import Topic
-from opinion_builder.models.websocket import (
-    DepthDiffMessage,
-    LastPriceMessage,
-    LastTradeMessage,
-)
+from opinion_builder.models.websocket import LastPriceMessage, LastTradeMessage, WebSocketMessage
+from opinion_builder.utils.parsing import parse_float, to_utc
+
+_WORD_RE = re.compile(r"\w+")
+
+# WebSocket messages carrying a price for the topic
+_PRICE_MESSAGES = (LastPriceMessage, LastTradeMessage)
+
+
+def _date_key(value: datetime | None) -> tuple[bool, datetime | None]:
+    """Sort key for an optional datetime, missing values first."""
+    # Naive and aware datetimes don't compare, key them all as aware UTC
+    return (value is not None, to_utc(value))
+
+
+# Sort field -> key function
+SORT_KEYS: dict[str, Callable[[Topic], Any]] = {
+    "end_date": lambda t: _date_key(t.end_date),
+    "created_at": lambda t: _date_key(t.created_at),
+    "volume": lambda t: t.volume_f or 0.0,
+    "last_price": lambda t: t.last_price_f or 0.0,
+}
 
 
 class CacheService:
@@ -20,35 +46,123 @@ class CacheService:
     def __init__(self, max_size: int = 10000) -> None:
         """Initialize the cache."""
         self._topics: OrderedDict[int, Topic] = OrderedDict()
+        # Immutable view of the topics, rebuilt on every write
+        self._snapshot: tuple[Topic, ...] = ()
         self._lock = asyncio.Lock()
         self._max_size = max_size or settings.cache_max_size
-        # Search index: keyword -> set of market_ids
-        self._search_index: dict[str, set[int]] = {}
+        # ID index: topic.id -> market_id
+        self._id_index: dict[str, int] = {}
+        # Search index: keyword -> word id, word id -> keyword and sorted market_ids.
+        # Ids of words no topic uses anymore are freed (keyword None) and reused.
+        self._vocab: dict[str, int] = {}
+        self._words: list[str | None] = []
+        self._postings: list[array[int]] = []
+        self._free_word_ids: list[int] = []
+        # Lowercased text and category sets: market_id -> value
+        self._lowered_q: dict[int, str] = {}
+        self._lowered_desc: dict[int, str] = {}
+        self._cat_set: dict[int, frozenset[str]] = {}
+        # Sorted indexes: field -> (sort key, market_id) entries
+        self._sorted: dict[str, SortedList] = {field: SortedList() for field in SORT_KEYS}
+        # Indexed sort keys: field -> market_id -> sort key
+        self._sort_keys: dict[str, dict[int, Any]] = {field: {} for field in SORT_KEYS}
 
     async def get_topic(self, market_id: int) -> Topic | None:
         """Get a topic by market ID."""
         async with self._lock:
             return self._topics.get(market_id)
 
+    async def get_by_topic_id(self, topic_id: str) -> Topic | None:
+        """Get a topic by its topic ID."""
+        market_id = self._id_index.get(topic_id)
+        if market_id is None:
+            return None
+        return self._topics.get(market_id)
+
     async def set_topic(self, topic: Topic) -> None:
         """Set a topic in the cache."""
         async with self._lock:
             market_id = topic.market_id
             # Remove if exists to update order
-            if market_id in self._topics:
-                del self._topics[market_id]
+            previous = self._topics.pop(market_id, None)
+            if previous is not None:
+                self._unindex_topic(previous)
             self._topics[market_id] = topic
-            # Update search index
-            self._update_search_index(topic)
+            self._index_topic(topic)
             # Evict oldest if over limit
             if len(self._topics) > self._max_size:
-                self._topics.popitem(last=False)
+                _, evicted = self._topics.popitem(last=False)
+                self._unindex_topic(evicted)
+            self._snapshot = tuple(self._topics.values())
 
     async def get_all_topics(self) -> list[Topic]:
         """Get all topics."""
         async with self._lock:
             return list(self._topics.values())
 
+    def get_snapshot(self) -> tuple[Topic, ...]:
+        """Get an immutable snapshot of all topics without taking the lock."""
+        return self._snapshot
+
+    def get_lowered_question(self, market_id: int) -> str | None:
+        """Get the lowercased question of a cached topic."""
+        return self._lowered_q.get(market_id)
+
+    def get_category_set(self, market_id: int) -> frozenset[str] | None:
+        """Get the categories of a cached topic as a set."""
+        return self._cat_set.get(market_id)
+
+    async def get_sorted_topics(
+        self, field: str, reverse: bool, start: int, stop: int
+    ) -> tuple[list[Topic], int]:
+        """Get a slice of topics ordered by a sort field, and the total count."""
+        async with self._lock:
+            index = self._sorted[field]
+            total = len(index)
+            if reverse:
+                entries = index.islice(max(total - stop, 0), max(total - start, 0), reverse=True)
+            else:
+                entries = index.islice(start, stop)
+            return [self._topics[market_id] for _, market_id in entries], total
+
+    async def get_topics_after(
+        self,
+        after_end_date: datetime | None,
+        after_id: str | None,
+        reverse: bool,
+        limit: int,
+        end_date_after: datetime | None = None,
+        end_date_before: datetime | None = None,
+    ) -> tuple[list[Topic], int]:
+        """Get the topics following a keyset cursor in end date order, and the total count.
+
+        The cursor is the end date and ID of the last topic of the previous page.
+        Without a known ID, every topic sharing the cursor's end date is skipped.
+        """
+        async with self._lock:
+            index = self._sorted["end_date"]
+
+            # Range of entries within the end date bounds, undated topics excluded
+            low, high = 0, len(index)
+            if end_date_after is not None:
+                low = index.bisect_left((_date_key(end_date_after),))
+            elif end_date_before is not None:
+                low = index.bisect_left(((True,),))
+            if end_date_before is not None:
+                high = index.bisect_right((_date_key(end_date_before), math.inf))
+            total = max(high - low, 0)
+
+            market_id = self._id_index.get(after_id) if after_id is not None else None
+            if reverse:
+                tie = market_id if market_id is not None else -math.inf
+                stop = min(index.bisect_left((_date_key(after_end_date), tie)), high)
+                entries = index.islice(max(stop - limit, low), stop, reverse=True)
+            else:
+                tie = market_id if market_id is not None else math.inf
+                start = max(index.bisect_right((_date_key(after_end_date), tie)), low)
+                entries = index.islice(start, min(start + limit, high))
+            return [self._topics[mid] for _, mid in entries], total
+
     async def get_topic_count(self) -> int:
         """Get the number of topics in cache."""
         async with self._lock:
@@ -59,54 +173,87 @@ class CacheService:
         async with self._lock:
             topic = self._topics.get(market_id)
             if topic:
-                if outcome_side == 1:  # Yes
-                    topic.yes_price = price
-                    topic.last_price = price
-                elif outcome_side == 2:  # No
-                    topic.no_price = price
+                self._apply_price(topic, outcome_side, price)
                 topic.updated_at = datetime.now()
 
-    async def update_from_ws_message(
-        self,
-        message: DepthDiffMessage | LastPriceMessage | LastTradeMessage,
-    ) -> None:
-        """Update topic from WebSocket message."""
+    async def update_from_ws_message(self, message: WebSocketMessage) -> None:
+        """Update cache from a WebSocket message."""
+        await self.update_from_ws_messages((message,))
+
+    async def update_from_ws_messages(self, messages: Sequence[WebSocketMessage]) -> None:
+        """Update cache from a batch of WebSocket messages under a single lock."""
         async with self._lock:
-            topic = self._topics.get(message.market_id)
-            if not topic:
-                return
-
-            topic.updated_at = datetime.now()
-
-            if isinstance(message, LastPriceMessage):
-                if message.outcome_side == 1:
-                    topic.yes_price = message.price
-                    topic.last_price = message.price
-                elif message.outcome_side == 2:
-                    topic.no_price = message.price
-            elif isinstance(message, LastTradeMessage):
-                # Update volume if possible
-                if message.outcome_side == 1:
-                    topic.yes_price = message.price
-                    topic.last_price = message.price
-                elif message.outcome_side == 2:
-                    topic.no_price = message.price
+            now = datetime.now()
+            for message in messages:
+                topic = self._topics.get(message.market_id)
+                if not topic:
+                    continue
+                topic.updated_at = now
+                if isinstance(message, _PRICE_MESSAGES):
+                    self._apply_price(topic, message.outcome_side, message.price)
 
     async def search(self, query: str, limit: int = 100) -> list[Topic]:
-        """Search topics by keyword."""
+        """Search topics by keyword, ranked by fuzzy match score."""
         async with self._lock:
             query_lower = query.lower()
-            results: list[Topic] = []
+            words = _WORD_RE.findall(query_lower)
+            postings: list[Sequence[int]] = []
+            for word in words:
+                market_ids = self._word_postings(word)
+                if not market_ids:
+                    # Tolerate partial words and typos
+                    market_ids = self._similar_word_postings(word)
+                if not market_ids:
+                    # Nothing indexed comes close, judge the whole query below
+                    postings = []
+                    break
+                postings.append(market_ids)
+
+            if postings:
+                # Every candidate contains the indexed query words; rank them all
+                candidates = self._intersect(postings)
+                choices = {market_id: self._lowered_q[market_id] for market_id in candidates}
+                matches = process.extract(
+                    query_lower, choices, scorer=fuzz.partial_ratio, limit=limit
+                )
+            else:
+                # Some query word is not in the index, fall back to fuzzy matching questions
+                matches = process.extract(
+                    query_lower,
+                    self._lowered_q,
+                    scorer=fuzz.partial_ratio,
+                    limit=limit,
+                    score_cutoff=60,
+                )
+
+            return [self._topics[market_id] for _, _, market_id in matches]
 
-            for topic in self._topics.values():
-                if (
-                    query_lower in topic.question.lower()
-                    or (topic.description and query_lower in topic.description.lower())
-                    or any(query_lower in cat.lower() for cat in (topic.categories or []))
-                ):
-                    results.append(topic)
-                    if len(results) >= limit:
-                        break
+    async def search_exact(self, query: str, limit: int = 100) -> list[Topic]:
+        """Search topics whose question contains the query."""
+        async with self._lock:
+            query_lower = query.lower()
+            query_len = len(query_lower)
+            # Words enclosed by non-word characters in the query can only
+            # appear as whole words in a matching question
+            postings = [
+                self._word_postings(match.group())
+                for match in _WORD_RE.finditer(query_lower)
+                if match.start() > 0 and match.end() < query_len
+            ]
+            if postings:
+                # In market_id order, so the limit keeps the same topics every time
+                candidates = sorted(self._intersect(postings))
+                questions = [(market_id, self._lowered_q[market_id]) for market_id in candidates]
+            else:
+                questions = self._lowered_q.items()
+
+            results: list[Topic] = []
+            for market_id, question in questions:
+                if len(question) < query_len or query_lower not in question:
+                    continue
+                results.append(self._topics[market_id])
+                if len(results) >= limit:
+                    break
 
             return results
 
@@ -114,22 +261,139 @@ class CacheService:
         """Initialize cache with a list of topics."""
         async with self._lock:
             for topic in topics:
+                previous = self._topics.get(topic.market_id)
+                if previous is not None:
+                    self._unindex_topic(previous)
                 self._topics[topic.market_id] = topic
-                self._update_search_index(topic)
+                self._index_topic(topic)
+            self._snapshot = tuple(self._topics.values())
+
+    def _index_topic(self, topic: Topic) -> None:
+        """Add a topic to the secondary indexes."""
+        market_id = topic.market_id
+        self._id_index[topic.id] = market_id
+        self._lowered_q[market_id] = topic.question.lower()
+        if topic.description:
+            self._lowered_desc[market_id] = topic.description.lower()
+        self._cat_set[market_id] = frozenset(topic.categories or ())
+        # Numeric copies and UTC dates for filtering and sorting, whichever path
+        # built the topic
+        topic.last_price_f = parse_float(topic.last_price)
+        topic.volume_f = parse_float(topic.volume)
+        topic.end_date = to_utc(topic.end_date)
+        topic.created_at = to_utc(topic.created_at)
+        for field, key_func in SORT_KEYS.items():
+            key = key_func(topic)
+            self._sort_keys[field][topic.market_id] = key
+            self._sorted[field].add((key, topic.market_id))
+        self._update_search_index(topic)
+
+    def _unindex_topic(self, topic: Topic) -> None:
+        """Remove a topic from the secondary indexes."""
+        market_id = topic.market_id
+        for word in self._search_words(market_id):
+            word_id = self._vocab.get(word)
+            if word_id is None:
+                continue
+            market_ids = self._postings[word_id]
+            i = bisect_left(market_ids, market_id)
+            if i < len(market_ids) and market_ids[i] == market_id:
+                del market_ids[i]
+            if not market_ids:
+                del self._vocab[word]
+                self._words[word_id] = None
+                self._free_word_ids.append(word_id)
+        for field in SORT_KEYS:
+            key = self._sort_keys[field].pop(market_id)
+            self._sorted[field].remove((key, market_id))
+        self._id_index.pop(topic.id, None)
+        self._lowered_q.pop(market_id, None)
+        self._lowered_desc.pop(market_id, None)
+        self._cat_set.pop(market_id, None)
+
+    def _similar_word_postings(self, word: str) -> set[int]:
+        """Collect market_ids of indexed words starting with a word or a few edits away."""
+        # Scan the vocabulary in C, freed ids (None) are skipped; the index of
+        # each match is its word id
+        matches = process.extract(
+            word, self._words, scorer=Prefix.similarity, score_cutoff=len(word), limit=None
+        )
+        max_distance = len(word) // 4
+        if max_distance:
+            matches += process.extract(
+                word,
+                self._words,
+                scorer=Levenshtein.distance,
+                score_cutoff=max_distance,
+                limit=None,
+            )
+        market_ids: set[int] = set()
+        for _, _, word_id in matches:
+            market_ids.update(self._postings[word_id])
+        return market_ids
+
+    def _apply_price(self, topic: Topic, outcome_side: int, price: str) -> None:
+        """Apply a price update for one outcome side of a topic."""
+        if outcome_side == 1:  # Yes
+            topic.yes_price = price
+            topic.last_price = price
+            topic.last_price_f = parse_float(price)
+            self._reindex_sort_key(topic, "last_price")
+        elif outcome_side == 2:  # No
+            topic.no_price = price
+
+    def _reindex_sort_key(self, topic: Topic, field: str) -> None:
+        """Move a topic within a sorted index after its field changed."""
+        keys = self._sort_keys[field]
+        key = SORT_KEYS[field](topic)
+        if keys[topic.market_id] == key:
+            return
+        self._sorted[field].remove((keys[topic.market_id], topic.market_id))
+        keys[topic.market_id] = key
+        self._sorted[field].add((key, topic.market_id))
 
     def _update_search_index(self, topic: Topic) -> None:
         """Update search index for a topic."""
-        # Extract keywords from question and categories
-        words = set(topic.question.lower().split())
-        if topic.description:
-            words.update(topic.description.lower().split())
-        for category in topic.categories or []:
-            words.update(category.lower().split())
-
-        for word in words:
-            if word not in self._search_index:
-                self._search_index[word] = set()
-            self._search_index[word].add(topic.market_id)
+        market_id = topic.market_id
+        for word in self._search_words(market_id):
+            word_id = self._vocab.get(word)
+            if word_id is None:
+                if self._free_word_ids:
+                    word_id = self._free_word_ids.pop()
+                    self._words[word_id] = word
+                else:
+                    word_id = len(self._postings)
+                    self._words.append(word)
+                    self._postings.append(array("q"))
+                self._vocab[word] = word_id
+            market_ids = self._postings[word_id]
+            i = bisect_left(market_ids, market_id)
+            if i == len(market_ids) or market_ids[i] != market_id:
+                market_ids.insert(i, market_id)
+
+    def _word_postings(self, word: str) -> Sequence[int]:
+        """Get the sorted market_ids of topics containing a word."""
+        word_id = self._vocab.get(word)
+        return self._postings[word_id] if word_id is not None else array("q")
+
+    def _intersect(self, postings: list[Sequence[int]]) -> set[int]:
+        """Intersect postings lists, starting from the shortest."""
+        postings = sorted(postings, key=len)
+        candidates = set(postings[0])
+        for market_ids in postings[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(market_ids)
+        return candidates
+
+    def _search_words(self, market_id: int) -> set[str]:
+        """Extract keywords from an indexed topic's question, description and categories."""
+        words = set(_WORD_RE.findall(self._lowered_q[market_id]))
+        if market_id in self._lowered_desc:
+            words.update(_WORD_RE.findall(self._lowered_desc[market_id]))
+        for category in self._cat_set[market_id]:
+            words.update(_WORD_RE.findall(category.lower()))
+        return words
 
 
 # Global cache instance
@@ -1,9 +1,14 @@
 """Topic service for business logic."""
 
+import asyncio
+import heapq
+from collections.abc import Callable, Sequence
 from datetime import datetime
 from decimal import Decimal
+from typing import Any
 
 from opinion_builder.models.filter import (
+    DateRangeFilter,
     Filters,
     Pagination,
     SortOption,
@@ -11,7 +16,27 @@ from opinion_builder.models.filter import (
 )
 from opinion_builder.models.topic import Topic
 from opinion_builder.sdk.client import OpinionSDKClient
-from opinion_builder.services.cache_service import cache
+from opinion_builder.services.cache_service import SORT_KEYS, cache
+from opinion_builder.utils.parsing import to_utc
+
+# Topic fields taken as-is from the SDK that must be str or None
+_OPTIONAL_STR_FIELDS = ("description", "last_price", "yes_price", "no_price", "liquidity", "slug")
+
+
+def _keyword_matcher(keywords: list[str]) -> Callable[[str], bool] | None:
+    """Build a matcher telling whether any of the keywords occurs in a text."""
+    if not keywords:
+        return None
+    if "" in keywords:
+        return lambda text: True
+    # Imported lazily, only keyword filters need it
+    import ahocorasick
+
+    automaton = ahocorasick.Automaton()
+    for keyword in keywords:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return lambda text: next(automaton.iter(text), None) is not None
 
 
 class TopicService:
@@ -29,22 +54,40 @@ class TopicService:
         end_date_after: datetime | None = None,
         order_by: str = "end_date",
         order: str = "asc",
+        after_end_date: datetime | None = None,
+        after_id: str | None = None,
     ) -> tuple[list[Topic], int]:
-        """Get topics with filtering and pagination."""
-        all_topics = await cache.get_all_topics()
-        filtered = self._apply_filters(all_topics, end_date_before, end_date_after)
-        sorted_topics = self._apply_sort(filtered, order_by, order)
-        total = len(sorted_topics)
-        paginated = self._apply_pagination(sorted_topics, limit, offset)
-        return paginated, total
+        """Get topics with filtering and pagination.
+
+        Passing the end date and ID of the last topic seen pages by keyset on the
+        end date index instead of by offset, which is preferred for deep pages.
+        """
+        if after_end_date is not None or after_id is not None:
+            return await cache.get_topics_after(
+                after_end_date,
+                after_id,
+                order.lower() == "desc",
+                limit,
+                end_date_after=end_date_after,
+                end_date_before=end_date_before,
+            )
+
+        if end_date_before is None and end_date_after is None and order_by in SORT_KEYS:
+            # Unfiltered: page straight off the cache's sorted index
+            return await cache.get_sorted_topics(
+                order_by, order.lower() == "desc", offset, offset + limit
+            )
+
+        filters = Filters(
+            end_date_range=DateRangeFilter(start=end_date_after, end=end_date_before)
+        )
+        return await asyncio.to_thread(
+            self._run_pipeline, cache.get_snapshot(), filters, order_by, order, limit, offset
+        )
 
     async def get_topic_by_id(self, topic_id: str) -> Topic | None:
         """Get a single topic by ID."""
-        all_topics = await cache.get_all_topics()
-        for topic in all_topics:
-            if topic.id == topic_id:
-                return topic
-        return None
+        return await cache.get_by_topic_id(topic_id)
 
     async def search_topics(
         self,
@@ -55,29 +98,32 @@ class TopicService:
         """Search topics by keyword."""
         if fuzzy:
             return await cache.search(query, limit)
-        # Exact match (simplified)
-        all_topics = await cache.get_all_topics()
-        results = [
-            t for t in all_topics if query.lower() in t.question.lower()
-        ]
-        return results[:limit]
+        return await cache.search_exact(query, limit)
 
     async def filter_topics(self, request: TopicFilterRequest) -> tuple[list[Topic], int]:
         """Advanced filter topics."""
-        all_topics = await cache.get_all_topics()
         filters = request.filters or Filters()
         sort_opt = request.sort or SortOption()
         pagination = request.pagination or Pagination()
 
-        filtered = self._apply_advanced_filters(all_topics, filters)
-        sorted_topics = self._apply_sort(
-            filtered, sort_opt.field, sort_opt.order
-        )
-        total = len(sorted_topics)
-        paginated = self._apply_pagination(
-            sorted_topics, pagination.limit, pagination.offset
+        if not filters.model_fields_set and sort_opt.field in SORT_KEYS:
+            # Unfiltered: page straight off the cache's sorted index
+            return await cache.get_sorted_topics(
+                sort_opt.field,
+                sort_opt.order.lower() == "desc",
+                pagination.offset,
+                pagination.offset + pagination.limit,
+            )
+
+        return await asyncio.to_thread(
+            self._run_pipeline,
+            cache.get_snapshot(),
+            filters,
+            sort_opt.field,
+            sort_opt.order,
+            pagination.limit,
+            pagination.offset,
         )
-        return paginated, total
 
     async def load_initial_topics(self) -> None:
         """Load topics from SDK and initialize cache."""
@@ -92,140 +138,149 @@ class TopicService:
     def _market_to_topic(self, market: dict) -> Topic | None:
         """Convert market dict to Topic model."""
         try:
-            return Topic(
-                id=str(market.get("id", "")),
-                market_id=int(market.get("id", 0)),
-                question=market.get("question", ""),
-                description=market.get("description"),
-                end_date=self._parse_datetime(market.get("endDate")),
-                outcome_type=market.get("outcomeType", "binary"),
-                volume=self._parse_decimal(market.get("volume")),
-                last_price=market.get("lastPrice"),
-                yes_price=market.get("yesPrice"),
-                no_price=market.get("noPrice"),
-                liquidity=market.get("liquidity"),
-                created_at=self._parse_datetime(market.get("createdAt")),
-                updated_at=datetime.now(),
-                categories=market.get("categories", []),
-                slug=market.get("slug", ""),
-            )
+            fields: dict[str, Any] = {
+                "id": str(market.get("id", "")),
+                "market_id": int(market.get("id", 0)),
+                "question": market.get("question", ""),
+                "description": market.get("description"),
+                "end_date": self._parse_datetime(market.get("endDate")),
+                "outcome_type": market.get("outcomeType", "binary"),
+                "volume": self._parse_decimal(market.get("volume")),
+                "last_price": market.get("lastPrice"),
+                "yes_price": market.get("yesPrice"),
+                "no_price": market.get("noPrice"),
+                "liquidity": market.get("liquidity"),
+                "created_at": self._parse_datetime(market.get("createdAt")),
+                "updated_at": datetime.now(),
+                "categories": market.get("categories", []),
+                "slug": market.get("slug", ""),
+            }
+            # Skip validation for well-formed SDK data, validate anything else
+            if self._has_topic_types(fields):
+                return Topic.model_construct(**fields)
+            return Topic(**fields)
         except Exception:
             return None
 
-    def _apply_filters(
+    def _has_topic_types(self, fields: dict[str, Any]) -> bool:
+        """Check that raw market fields already have the types Topic expects."""
+        if not isinstance(fields["question"], str) or not isinstance(fields["outcome_type"], str):
+            return False
+        for name in _OPTIONAL_STR_FIELDS:
+            if fields[name] is not None and not isinstance(fields[name], str):
+                return False
+        categories = fields["categories"]
+        return categories is None or (
+            isinstance(categories, list) and all(isinstance(c, str) for c in categories)
+        )
+
+    def _run_pipeline(
         self,
-        topics: list[Topic],
-        end_date_before: datetime | None,
-        end_date_after: datetime | None,
-    ) -> list[Topic]:
-        """Apply date filters."""
-        filtered = topics
-        if end_date_before:
-            filtered = [t for t in filtered if t.end_date and t.end_date <= end_date_before]
-        if end_date_after:
-            filtered = [t for t in filtered if t.end_date and t.end_date >= end_date_after]
-        return filtered
+        topics: Sequence[Topic],
+        filters: Filters,
+        field: str,
+        order: str,
+        limit: int,
+        offset: int,
+    ) -> tuple[list[Topic], int]:
+        """Filter, sort and paginate topics, off the event loop."""
+        filtered = self._apply_advanced_filters(topics, filters)
+        sorted_topics = self._apply_sort(filtered, field, order, top=offset + limit)
+        return self._apply_pagination(sorted_topics, limit, offset), len(filtered)
+
+    def _apply_advanced_filters(
+        self, topics: Sequence[Topic], filters: Filters
+    ) -> Sequence[Topic]:
+        """Apply advanced filters in a single pass."""
+        date_range = filters.end_date_range
+        end_date_start = to_utc(date_range.start) if date_range else None
+        end_date_end = to_utc(date_range.end) if date_range else None
+        outcome_types = set(filters.outcome_types or [])
+        categories = set(filters.categories or [])
+        keyword_matcher = _keyword_matcher([k.lower() for k in filters.keywords or []])
+        exclude_matcher = _keyword_matcher([k.lower() for k in filters.exclude_keywords or []])
+        price_range = filters.price_range
+        price_min = float(price_range.min) if price_range and price_range.min else None
+        price_max = float(price_range.max) if price_range and price_range.max else None
+        min_volume = filters.min_volume
+        max_volume = filters.max_volume
+        created_after = to_utc(filters.created_after)
 
-    def _apply_advanced_filters(self, topics: list[Topic], filters: Filters) -> list[Topic]:
-        """Apply advanced filters."""
-        filtered = topics
-
-        if filters.end_date_range:
-            if filters.end_date_range.start:
-                filtered = [
-                    t for t in filtered
-                    if t.end_date and t.end_date >= filters.end_date_range.start  # type: ignore
-                ]
-            if filters.end_date_range.end:
-                filtered = [
-                    t for t in filtered
-                    if t.end_date and t.end_date <= filters.end_date_range.end  # type: ignore
-                ]
-
-        if filters.outcome_types:
-            filtered = [t for t in filtered if t.outcome_type in filters.outcome_types]
-
-        if filters.categories:
-            filtered = [
-                t for t in filtered
-                if any(c in (t.categories or []) for c in filters.categories)
-            ]
-
-        if filters.keywords:
-            filtered = [
-                t for t in filtered
-                if any(k.lower() in t.question.lower() for k in filters.keywords)
-            ]
-
-        if filters.exclude_keywords:
-            filtered = [
-                t for t in filtered
-                if not any(k.lower() in t.question.lower() for k in filters.exclude_keywords)
-            ]
-
-        if filters.price_range:
-            if filters.price_range.min:
-                filtered = [
-                    t for t in filtered
-                    if t.last_price and float(t.last_price) >= float(filters.price_range.min)  # type: ignore
-                ]
-            if filters.price_range.max:
-                filtered = [
-                    t for t in filtered
-                    if t.last_price and float(t.last_price) <= float(filters.price_range.max)  # type: ignore
-                ]
-
-        if filters.min_volume is not None:
-            filtered = [
-                t for t in filtered
-                if t.volume and t.volume >= Decimal(str(filters.min_volume))  # type: ignore
-            ]
-
-        if filters.max_volume is not None:
-            filtered = [
-                t for t in filtered
-                if t.volume and t.volume <= Decimal(str(filters.max_volume))  # type: ignore
-            ]
-
-        if filters.created_after:
-            filtered = [
-                t for t in filtered
-                if t.created_at and t.created_at >= filters.created_after  # type: ignore
-            ]
+        filtered: list[Topic] = []
+        for t in topics:
+            if end_date_start and not (t.end_date and t.end_date >= end_date_start):
+                continue
+            if end_date_end and not (t.end_date and t.end_date <= end_date_end):
+                continue
+            if outcome_types and t.outcome_type not in outcome_types:
+                continue
+            if categories:
+                topic_categories = cache.get_category_set(t.market_id)
+                if topic_categories is None:
+                    topic_categories = frozenset(t.categories or ())
+                if topic_categories.isdisjoint(categories):
+                    continue
+
+            if keyword_matcher or exclude_matcher:
+                question = cache.get_lowered_question(t.market_id) or t.question.lower()
+                if keyword_matcher and not keyword_matcher(question):
+                    continue
+                if exclude_matcher and exclude_matcher(question):
+                    continue
+
+            if price_min is not None or price_max is not None:
+                price = t.last_price_f
+                if price is None:
+                    continue
+                if price_min is not None and price < price_min:
+                    continue
+                if price_max is not None and price > price_max:
+                    continue
+
+            if min_volume is not None and not (t.volume_f and t.volume_f >= min_volume):
+                continue
+            if max_volume is not None and not (t.volume_f and t.volume_f <= max_volume):
+                continue
+            if created_after and not (t.created_at and t.created_at >= created_after):
+                continue
+
+            filtered.append(t)
 
         return filtered
 
-    def _apply_sort(self, topics: list[Topic], field: str, order: str) -> list[Topic]:
-        """Apply sorting."""
+    def _apply_sort(
+        self, topics: Sequence[Topic], field: str, order: str, top: int | None = None
+    ) -> Sequence[Topic]:
+        """Apply sorting, keeping only the first `top` topics when given."""
+        sort_key = SORT_KEYS.get(field)
+        if sort_key is None:
+            return topics
         reverse = order.lower() == "desc"
 
-        if field == "end_date":
-            return sorted(topics, key=lambda t: t.end_date or datetime.min, reverse=reverse)
-        elif field == "created_at":
-            return sorted(topics, key=lambda t: t.created_at or datetime.min, reverse=reverse)
-        elif field == "volume":
-            return sorted(topics, key=lambda t: t.volume or Decimal(0), reverse=reverse)
-        elif field == "last_price":
-            return sorted(
-                topics,
-                key=lambda t: float(t.last_price or 0),
-                reverse=reverse,
-            )
-        return topics
+        # Ties broken on market_id, in the same order as the cache's sorted indexes
+        def key(t: Topic) -> tuple[Any, int]:
+            return (sort_key(t), t.market_id)
+
+        if top is not None and top < len(topics) // 2:
+            # Partial sort in O(N log top), same order as sorted()[:top]
+            select = heapq.nlargest if reverse else heapq.nsmallest
+            return select(top, topics, key=key)
+        return sorted(topics, key=key, reverse=reverse)
 
     def _apply_pagination(
-        self, topics: list[Topic], limit: int, offset: int
+        self, topics: Sequence[Topic], limit: int, offset: int
     ) -> list[Topic]:
         """Apply pagination."""
-        return topics[offset : offset + limit]
+        return list(topics[offset : offset + limit])
 
     def _parse_datetime(self, value: str | None) -> datetime | None:
         """Parse datetime from string."""
         if not value:
             return None
         try:
-            return datetime.fromisoformat(value.replace("Z", "+00:00"))
-        except Exception:
+            # fromisoformat accepts a trailing "Z" since Python 3.11
+            return to_utc(datetime.fromisoformat(value))
+        except (TypeError, ValueError):
             return None
 
     def _parse_decimal(self, value: str | float | None) -> Decimal | None:
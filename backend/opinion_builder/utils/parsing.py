@@ -0,0 +1,26 @@
+"""Parsing helpers for upstream market data."""
+
+import math
+from datetime import UTC, datetime
+from typing import Any
+
+
+def parse_float(value: Any) -> float | None:
+    """Parse a float from a string or number, None if missing, invalid or not finite."""
+    if value is None:
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    # NaN and infinities would break the ordering of the sorted indexes
+    return number if math.isfinite(number) else None
+
+
+def to_utc(value: datetime | None) -> datetime | None:
+    """Convert a datetime to aware UTC, taking naive values as UTC."""
+    if value is None or value.tzinfo is UTC:
+        return value
+    if value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value.astimezone(UTC)
@@ -1,25 +1,67 @@
-"""WebSocket consumer for opinion.trade real-time updates."""
+"""WebSocket consumer for opinion.trade real-time updates.
+
+Every inbound frame goes through the event loop, so the host application should
+run on uvloop, as the server entry point does.
+"""
 
 import asyncio
-import json
+import functools
 import logging
+import random
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
+import msgspec
+import orjson
 import websocket
-from pydantic import ValidationError
 
 from opinion_builder.config import settings
-from opinion_builder.models.websocket import (
-    DepthDiffMessage,
-    LastPriceMessage,
-    LastTradeMessage,
-    MessageType,
-    WebSocketSubscribeMessage,
-)
+from opinion_builder.models.websocket import MessageType, WebSocketMessage
 from opinion_builder.services.cache_service import cache
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of inbound messages waiting to be handled
+_INBOX_SIZE = 10_000
+
+# Maximum number of inbound messages applied to the cache at once
+_BATCH_SIZE = 128
+
+# Seconds to wait for a protocol-level pong before dropping the connection
+_PING_TIMEOUT = 10
+
+# Heartbeat frame, encoded once
+_HEARTBEAT_FRAME = orjson.dumps({"action": "HEARTBEAT"}).decode()
+
+# Message type of a frame, found without parsing the whole frame
+_MSG_TYPE_RE = re.compile(rb'"msgType"\s*:\s*"([^"]+)"')
+
+# Message types decoded and applied to the cache, and types dropped silently
+_APPLIED_TYPES = frozenset(t.value.encode() for t in MessageType)
+_IGNORED_TYPES = frozenset({b"PONG"})  # Heartbeat response
+
+# Decodes a frame straight into the message struct picked by its msgType tag
+_decoder = msgspec.json.Decoder(WebSocketMessage, strict=False)
+
+
+# Subscribe frames, filled in with the market ID. Same bytes as an encoded
+# WebSocketSubscribeMessage.
+_PRICE_FRAME = b'{"action":"SUBSCRIBE","channel":"market.last.price","marketId":%d}'
+_ROOT_PRICE_FRAME = b'{"action":"SUBSCRIBE","channel":"market.last.price","rootMarketId":%d}'
+_DEPTH_FRAME = b'{"action":"SUBSCRIBE","channel":"market.depth.diff","marketId":%d}'
+_TRADE_FRAME = b'{"action":"SUBSCRIBE","channel":"market.last.trade","marketId":%d}'
+
+
+def _market_frames(market_id: int, outcome_type: str) -> tuple[bytes, ...]:
+    """Subscribe frames for all channels of a market."""
+    if outcome_type == "categorical":
+        # For categorical markets, use rootMarketId
+        return (_ROOT_PRICE_FRAME % market_id,)
+    # Also subscribe to depth and trade channels
+    return (_PRICE_FRAME % market_id, _DEPTH_FRAME % market_id, _TRADE_FRAME % market_id)
+
 
 class OpinionWebSocketConsumer:
     """WebSocket consumer for opinion.trade."""
@@ -35,161 +77,229 @@ class OpinionWebSocketConsumer:
         self.url = url or settings.opinion_ws_url
         self.heartbeat_interval = heartbeat_interval or settings.opinion_ws_heartbeat_interval
         self._ws: websocket.WebSocketApp | None = None
+        # Running until stop(), connected while a connection is open
         self._running = False
-        self._heartbeat_task: asyncio.Task[None] | None = None
-        self._reconnect_delay = 5
+        self._connected = False
+        self._connect_task: asyncio.Task[None] | None = None
+        self._heartbeat_handle: asyncio.TimerHandle | None = None
+        # Inbound messages appended by the WebSocket thread, oldest dropped when full
+        self._inbox: deque[bytes] = deque(maxlen=_INBOX_SIZE)
+        # Messages dropped since the inbox last filled up, 0 while it has room
+        self._dropped = 0
+        # Set once per burst to wake the consumer task
+        self._inbox_ready = asyncio.Event()
+        self._wakeup_pending = False
+        self._consumer_task: asyncio.Task[None] | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        # Dedicated thread for the blocking WebSocket client
+        self._ws_executor: ThreadPoolExecutor | None = None
+        self._min_reconnect_delay = 5
+        self._reconnect_delay = self._min_reconnect_delay
         self._max_reconnect_delay = 60
+        # Set by stop() to wake a pending reconnect wait
+        self._stop_event = asyncio.Event()
 
     @property
     def is_connected(self) -> bool:
         """Check if WebSocket is connected."""
-        return self._ws is not None and self._running
+        return self._ws is not None and self._connected
 
     async def start(self) -> None:
-        """Start the WebSocket connection."""
+        """Start the WebSocket connection, reconnecting in the background until stopped."""
         self._running = True
-        await self._connect_with_retry()
+        self._stop_event.clear()
+        if self._consumer_task is None:
+            self._consumer_task = asyncio.create_task(self._consume())
+        if self._connect_task is None:
+            self._connect_task = asyncio.create_task(self._connect_with_retry())
 
     async def stop(self) -> None:
         """Stop the WebSocket connection."""
         self._running = False
+        self._stop_event.set()
         if self._ws:
             self._ws.close()
-        if self._heartbeat_task:
-            self._heartbeat_task.cancel()
-            try:
-                await self._heartbeat_task
-            except asyncio.CancelledError:
-                pass
+        self._cancel_heartbeat()
+        for task in (self._connect_task, self._consumer_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._connect_task = None
+        self._consumer_task = None
+        if self._ws_executor:
+            self._ws_executor.shutdown(wait=False)
+            self._ws_executor = None
 
     async def _connect_with_retry(self) -> None:
-        """Connect with auto-retry."""
+        """Connect with auto-retry, backing off with decorrelated jitter."""
         while self._running:
+            # run_forever reports failures through the callbacks and returns, so any
+            # return while still running is a disconnect
             try:
                 await self._connect()
-                self._reconnect_delay = 5  # Reset on success
             except Exception as e:
-                logger.error(f"WebSocket connection error: {e}")
-                if self._running:
-                    await asyncio.sleep(self._reconnect_delay)
-                    self._reconnect_delay = min(
-                        self._reconnect_delay * 2, self._max_reconnect_delay
-                    )
+                logger.error("WebSocket connection error: %s", e)
+            if not self._running:
+                break
+
+            # The delay is reset by _on_open once a connection succeeds
+            self._reconnect_delay = min(
+                self._max_reconnect_delay,
+                random.uniform(self._min_reconnect_delay, self._reconnect_delay * 3),
+            )
+            logger.info("Reconnecting WebSocket in %.1fs", self._reconnect_delay)
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), self._reconnect_delay)
+            except TimeoutError:
+                pass
 
     async def _connect(self) -> None:
         """Establish WebSocket connection."""
         ws_url = f"{self.url}?apikey={self.api_key}"
 
-        def on_message(ws: websocket.WebSocketApp, message: str) -> None:
-            asyncio.create_task(self._handle_message(message))
-
-        def on_error(ws: websocket.WebSocketApp, error: Exception) -> None:
-            logger.error(f"WebSocket error: {error}")
-
-        def on_close(
-            ws: websocket.WebSocketApp,
-            close_status_code: int | None,
-            close_msg: str | None,
-        ) -> None:
-            logger.warning("WebSocket connection closed")
-            self._running = False
-
-        def on_open(ws: websocket.WebSocketApp) -> None:
-            logger.info("WebSocket connection established")
-            self._running = True
-            # Subscribe to all markets after connection
-            asyncio.create_task(self._subscribe_all_markets())
-
+        self._loop = loop = asyncio.get_running_loop()
         self._ws = websocket.WebSocketApp(
             ws_url,
-            on_message=on_message,
-            on_error=on_error,
-            on_close=on_close,
-            on_open=on_open,
+            on_message=self._on_message,
+            on_error=self._on_error,
+            on_close=self._on_close,
+            on_open=self._on_open,
         )
 
-        # Run WebSocket in a thread
-        await asyncio.to_thread(self._ws.run_forever)
-
-        # Start heartbeat after connection
-        self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+        # Run WebSocket in its own thread, with protocol-level pings to detect a dead peer.
+        # The opinion.trade HEARTBEAT is still sent, the server expects it to keep
+        # the connection alive. Text frames are delivered as undecoded bytes, the
+        # message validators check UTF-8 while parsing.
+        if self._ws_executor is None:
+            self._ws_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="opinion-ws")
+        run_forever = functools.partial(
+            self._ws.run_forever,
+            ping_interval=self.heartbeat_interval,
+            ping_timeout=min(_PING_TIMEOUT, self.heartbeat_interval / 2),
+            skip_utf8_validation=True,
+        )
+        try:
+            await loop.run_in_executor(self._ws_executor, run_forever)
+        finally:
+            self._connected = False
+            self._cancel_heartbeat()
 
-    async def _subscribe_all_markets(self) -> None:
-        """Subscribe to all markets in cache."""
-        topics = await cache.get_all_topics()
-        for topic in topics:
-            await self._subscribe_market(topic.market_id, topic.outcome_type)
+    def _subscribe_all_markets(self, ws: websocket.WebSocketApp) -> None:
+        """Subscribe to all markets in cache, sending the frames back-to-back."""
+        # Subscriptions do not survive the connection, start over on every open
+        topics = cache.get_snapshot()
+        frames = [
+            frame
+            for topic in topics
+            for frame in _market_frames(topic.market_id, topic.outcome_type)
+        ]
+        for frame in frames:
+            ws.send(frame)
 
-    async def _subscribe_market(self, market_id: int, outcome_type: str) -> None:
-        """Subscribe to market updates."""
-        if not self._ws:
+    def _send_heartbeat(self) -> None:
+        """Send a heartbeat message and schedule the next one."""
+        self._cancel_heartbeat()
+        if not (self._connected and self._ws and self._loop):
+            return
+        try:
+            self._ws.send(_HEARTBEAT_FRAME)
+        except Exception as e:
+            logger.error("Heartbeat error: %s", e)
             return
+        self._heartbeat_handle = self._loop.call_later(
+            self.heartbeat_interval, self._send_heartbeat
+        )
 
-        if outcome_type == "categorical":
-            # For categorical markets, use rootMarketId
-            msg = WebSocketSubscribeMessage(
-                action="SUBSCRIBE",
-                channel="market.last.price",
-                root_market_id=market_id,
-            )
-        else:
-            msg = WebSocketSubscribeMessage(
-                action="SUBSCRIBE",
-                channel="market.last.price",
-                market_id=market_id,
-            )
+    def _cancel_heartbeat(self) -> None:
+        """Cancel the next scheduled heartbeat, if any."""
+        if self._heartbeat_handle:
+            self._heartbeat_handle.cancel()
+            self._heartbeat_handle = None
 
-        self._ws.send(msg.to_json())
+    def _on_open(self, ws: websocket.WebSocketApp) -> None:
+        """Handle a new connection, on the WebSocket thread."""
+        logger.info("WebSocket connection established")
+        self._connected = True
+        self._reconnect_delay = self._min_reconnect_delay
+        # Subscribe to all markets after connection, from this thread
+        self._subscribe_all_markets(ws)
+        # Heartbeats run on the event loop for as long as the connection is up
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._send_heartbeat)
 
-        # Also subscribe to depth and trade channels
-        if outcome_type != "categorical":
-            depth_msg = WebSocketSubscribeMessage(
-                action="SUBSCRIBE",
-                channel="market.depth.diff",
-                market_id=market_id,
-            )
-            self._ws.send(depth_msg.to_json())
+    def _on_message(self, ws: websocket.WebSocketApp, message: bytes) -> None:
+        """Queue an inbound message, on the WebSocket thread."""
+        # Log once when the inbox fills up and once when it has room again
+        if len(self._inbox) == _INBOX_SIZE:
+            if not self._dropped:
+                logger.warning("WebSocket inbox full, dropping oldest messages")
+            self._dropped += 1
+        elif self._dropped:
+            logger.warning("WebSocket inbox recovered, dropped %d messages", self._dropped)
+            self._dropped = 0
+        self._inbox.append(message)
+        # Wake the consumer once per burst rather than once per message
+        if not self._wakeup_pending and self._loop is not None:
+            self._wakeup_pending = True
+            self._loop.call_soon_threadsafe(self._inbox_ready.set)
 
-            trade_msg = WebSocketSubscribeMessage(
-                action="SUBSCRIBE",
-                channel="market.last.trade",
-                market_id=market_id,
-            )
-            self._ws.send(trade_msg.to_json())
+    def _on_error(self, ws: websocket.WebSocketApp, error: Exception) -> None:
+        """Log a WebSocket error, on the WebSocket thread."""
+        logger.error("WebSocket error: %s", error)
 
-    async def _heartbeat_loop(self) -> None:
-        """Send heartbeat messages periodically."""
-        while self._running and self._ws:
-            try:
-                self._ws.send(json.dumps({"action": "HEARTBEAT"}))
-                await asyncio.sleep(self.heartbeat_interval)
-            except Exception as e:
-                logger.error(f"Heartbeat error: {e}")
-                break
+    def _on_close(
+        self,
+        ws: websocket.WebSocketApp,
+        close_status_code: int | None,
+        close_msg: str | None,
+    ) -> None:
+        """Handle a closed connection, on the WebSocket thread."""
+        logger.warning("WebSocket connection closed")
+        self._connected = False
+
+    async def _consume(self) -> None:
+        """Handle inbound messages in arrival order, a burst at a time."""
+        inbox = self._inbox
+        while True:
+            await self._inbox_ready.wait()
+            self._inbox_ready.clear()
+            self._wakeup_pending = False
+            while inbox:
+                batch = [inbox.popleft() for _ in range(min(_BATCH_SIZE, len(inbox)))]
+                await self._apply_batch(batch)
+                # The cache lock doesn't suspend when free, so yield to other
+                # tasks between batches to keep a backlog from stalling them
+                await asyncio.sleep(0)
+
+    async def _apply_batch(self, batch: list[bytes]) -> None:
+        """Parse a batch of inbound messages and apply them to the cache."""
+        parsed = [m for m in map(self._parse_message, batch) if m is not None]
+        if not parsed:
+            return
+        try:
+            await cache.update_from_ws_messages(parsed)
+        except Exception as e:
+            logger.error("Error applying messages: %s", e)
+
+    def _parse_message(self, message: bytes) -> WebSocketMessage | None:
+        """Parse an incoming WebSocket message, None if there is nothing to apply."""
+        match = _MSG_TYPE_RE.search(message)
+        msg_type = match.group(1) if match else None
+        if msg_type not in _APPLIED_TYPES:
+            if msg_type not in _IGNORED_TYPES and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Unhandled message type: %r", msg_type)
+            return None
 
-    async def _handle_message(self, message: str) -> None:
-        """Handle incoming WebSocket message."""
         try:
-            data: dict[str, Any] = json.loads(message)
-            msg_type = data.get("msgType")
-
-            if msg_type == MessageType.DEPTH_DIFF:
-                parsed = DepthDiffMessage(**data)
-                await cache.update_from_ws_message(parsed)
-            elif msg_type == MessageType.LAST_PRICE:
-                parsed = LastPriceMessage(**data)
-                await cache.update_from_ws_message(parsed)
-            elif msg_type == MessageType.LAST_TRADE:
-                parsed = LastTradeMessage(**data)
-                await cache.update_from_ws_message(parsed)
-            elif msg_type == "PONG":
-                pass  # Heartbeat response
-            else:
-                logger.debug(f"Unhandled message type: {msg_type}")
-        except ValidationError as e:
-            logger.warning(f"Message validation error: {e}")
+            return _decoder.decode(message)
+        except msgspec.ValidationError as e:
+            logger.warning("Message validation error: %s", e)
         except Exception as e:
-            logger.error(f"Error handling message: {e}")
+            logger.error("Error handling message: %s", e)
+        return None
 
     def get_status(self) -> dict[str, Any]:
         """Get WebSocket status."""
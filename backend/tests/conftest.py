@@ -0,0 +1,17 @@
+"""Shared test fixtures."""
+
+import pytest
+
+from opinion_builder.api.v1 import health
+from opinion_builder.services import topic_service
+from opinion_builder.services.cache_service import CacheService
+from opinion_builder.websocket import consumer
+
+
+@pytest.fixture(autouse=True)
+def topic_cache(monkeypatch: pytest.MonkeyPatch) -> CacheService:
+    """Fresh cache in place of the module-global one, so tests don't share topics."""
+    fresh = CacheService(max_size=10_000)
+    for module in (topic_service, consumer, health):
+        monkeypatch.setattr(module, "cache", fresh)
+    return fresh
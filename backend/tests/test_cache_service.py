@@ -0,0 +1,188 @@
+"""Tests for the in-memory topic cache and its indexes."""
+
+from datetime import UTC, datetime, timedelta
+
+from opinion_builder.models.filter import (
+    DateRangeFilter,
+    Filters,
+    PriceRange,
+    SortOption,
+    TopicFilterRequest,
+)
+from opinion_builder.models.topic import Topic
+from opinion_builder.services.cache_service import CacheService
+from opinion_builder.services.topic_service import TopicService
+
+BASE_DATE = datetime(2025, 1, 1, tzinfo=UTC)
+
+
+def _topic(market_id: int, days: int | None = 0, question: str | None = None) -> Topic:
+    """Binary topic ending `days` after BASE_DATE, or without end date when None."""
+    return Topic(
+        id=str(market_id),
+        market_id=market_id,
+        question=question or f"Question {market_id}",
+        outcome_type="binary",
+        end_date=None if days is None else BASE_DATE + timedelta(days=days),
+    )
+
+
+async def _ids(service: CacheService, field: str, reverse: bool = False) -> list[int]:
+    topics, _ = await service.get_sorted_topics(field, reverse, 0, 1000)
+    return [t.market_id for t in topics]
+
+
+async def test_set_topic_replace_reindexes() -> None:
+    service = CacheService(max_size=10)
+    await service.set_topic(_topic(1, days=5, question="Bitcoin above 100k"))
+    await service.set_topic(_topic(2, days=3))
+    await service.set_topic(_topic(1, days=1, question="Ethereum above 5k"))
+
+    assert await _ids(service, "end_date") == [1, 2]
+    _, total = await service.get_sorted_topics("end_date", False, 0, 10)
+    assert total == 2
+    assert [t.market_id for t in await service.search("ethereum")] == [1]
+    assert await service.search_exact("bitcoin") == []
+
+
+async def test_eviction_removes_topic_from_indexes() -> None:
+    service = CacheService(max_size=2)
+    for market_id in (1, 2, 3):
+        await service.set_topic(_topic(market_id, days=market_id, question=f"Rain {market_id}"))
+
+    assert await _ids(service, "end_date") == [2, 3]
+    assert await service.get_by_topic_id("1") is None
+    assert [t.market_id for t in await service.search_exact("rain 1")] == []
+    assert len(service.get_snapshot()) == 2
+
+
+async def test_price_update_moves_topic_in_last_price_index() -> None:
+    service = CacheService(max_size=10)
+    await service.initialize_topics([_topic(1), _topic(2), _topic(3)])
+    await service.update_price(1, 1, "0.9")
+    await service.update_price(2, 1, "0.1")
+    await service.update_price(3, 2, "0.5")  # No side price, index unchanged
+
+    assert await _ids(service, "last_price") == [3, 2, 1]
+    await service.update_price(2, 1, "0.95")
+    assert await _ids(service, "last_price") == [3, 1, 2]
+    assert await _ids(service, "last_price", reverse=True) == [2, 1, 3]
+
+
+async def test_index_and_pipeline_break_ties_the_same_way(topic_cache: CacheService) -> None:
+    # Inserted out of market_id order, with tied and missing end dates
+    await topic_cache.initialize_topics(
+        [_topic(m, days=m % 3 or None) for m in (5, 3, 9, 1, 7, 2, 8)]
+    )
+    service = TopicService(None)  # type: ignore[arg-type]
+
+    for order in ("asc", "desc"):
+        sort = SortOption(field="end_date", order=order)
+        from_index, _ = await service.filter_topics(TopicFilterRequest(sort=sort))
+        from_pipeline, _ = await service.filter_topics(
+            TopicFilterRequest(filters=Filters(keywords=[]), sort=sort)
+        )
+        assert [t.market_id for t in from_index] == [t.market_id for t in from_pipeline]
+
+
+async def test_search_tolerates_typos() -> None:
+    service = CacheService(max_size=10)
+    await service.set_topic(_topic(1, question="Will Bitcoin close above 100k?"))
+    await service.set_topic(_topic(2, question="Will Ethereum close above 5k?"))
+
+    assert [t.market_id for t in await service.search("bitcoim")] == [1]
+    assert [t.market_id for t in await service.search("etherium close")] == [2]
+    assert await service.search("zzzzzzzz") == []
+
+
+async def test_search_matches_partial_words() -> None:
+    service = CacheService(max_size=10)
+    await service.set_topic(_topic(1, question="Will Bitcoin close above 100k?"))
+    await service.set_topic(_topic(2, question="Who wins the 2024 election?"))
+    await service.set_topic(_topic(3, question="Ethereum ETF approved?"))
+
+    for query, expected in [
+        ("bit", [1]),
+        ("bitc", [1]),
+        ("eth", [3]),
+        ("elect", [2]),
+        ("100", [1]),
+    ]:
+        assert [t.market_id for t in await service.search(query)] == expected, query
+        assert [t.market_id for t in await service.search_exact(query)] == expected, query
+    # A word found nowhere is not dropped from the query
+    assert await service.search("bitcoin zzzzzzzz") == []
+
+
+async def test_indexing_parses_numeric_fields(topic_cache: CacheService) -> None:
+    # Built directly rather than from SDK data, so only the strings are set
+    topics = [
+        _topic(1).model_copy(update={"volume": "2500", "last_price": "0.4"}),
+        _topic(2).model_copy(update={"volume": "900", "last_price": "0.7"}),
+        _topic(3).model_copy(update={"volume": "1200.5", "last_price": "0.2"}),
+    ]
+    await topic_cache.initialize_topics(topics)
+    service = TopicService(None)  # type: ignore[arg-type]
+
+    request = TopicFilterRequest(
+        filters=Filters(min_volume=1000, price_range=PriceRange(max="0.5")),
+        sort=SortOption(field="volume", order="desc"),
+    )
+    result, total = await service.filter_topics(request)
+    assert [t.market_id for t in result] == [1, 3]
+    assert total == 2
+    assert await _ids(topic_cache, "last_price") == [3, 1, 2]
+
+
+async def test_non_finite_prices_keep_the_index_consistent() -> None:
+    service = CacheService(max_size=10)
+    await service.initialize_topics(
+        [_topic(1).model_copy(update={"last_price": "NaN", "volume": "inf"}), _topic(2), _topic(3)]
+    )
+    await service.update_price(2, 1, "nan")
+    await service.update_price(3, 1, "0.5")
+    await service.update_price(2, 1, "0.7")
+
+    assert await _ids(service, "last_price") == [1, 3, 2]
+    assert await _ids(service, "volume") == [1, 2, 3]
+
+
+async def test_naive_and_aware_dates_share_the_index(topic_cache: CacheService) -> None:
+    naive = _topic(2).model_copy(update={"end_date": datetime(2025, 1, 2)})
+    await topic_cache.initialize_topics([_topic(1, days=0), naive, _topic(3, days=2)])
+    service = TopicService(None)  # type: ignore[arg-type]
+
+    assert await _ids(topic_cache, "end_date") == [1, 2, 3]
+    page, total = await service.get_topics(end_date_after=datetime(2025, 1, 2), order="asc")
+    assert [t.market_id for t in page] == [2, 3]
+    assert total == 2
+    page, _ = await service.get_topics(after_end_date=datetime(2025, 1, 1), after_id="1")
+    assert [t.market_id for t in page] == [2, 3]
+    date_range = DateRangeFilter(start=datetime(2025, 1, 1, 12), end=BASE_DATE + timedelta(days=2))
+    result, _ = await service.filter_topics(
+        TopicFilterRequest(filters=Filters(end_date_range=date_range))
+    )
+    assert [t.market_id for t in result] == [2, 3]
+
+
+async def test_evicted_words_leave_the_vocabulary() -> None:
+    service = CacheService(max_size=2)
+    for market_id in range(1, 51):
+        await service.set_topic(_topic(market_id, question=f"Market word{market_id}"))
+
+    assert set(service._vocab) == {"market", "word49", "word50"}
+    # Freed word ids are reused rather than growing the index
+    assert len(service._words) <= 6
+    assert service._similar_word_postings("word1") == set()
+    assert [t.market_id for t in await service.search("word5")] == [50]
+
+
+async def test_search_exact_limit_keeps_lowest_market_ids() -> None:
+    service = CacheService(max_size=100)
+    for market_id in (64, 3, 97, 12, 40, 1, 88, 25):
+        await service.set_topic(
+            _topic(market_id, question=f"Will the Fed cut rates ({market_id})?")
+        )
+
+    results = await service.search_exact("the fed cut", limit=3)
+    assert [t.market_id for t in results] == [1, 3, 12]
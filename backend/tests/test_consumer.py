@@ -0,0 +1,160 @@
+"""Tests for the opinion.trade WebSocket consumer."""
+
+import asyncio
+import contextlib
+import logging
+
+import msgspec
+import pytest
+import websocket
+
+from opinion_builder.models.topic import Topic
+from opinion_builder.models.websocket import WebSocketSubscribeMessage
+from opinion_builder.services.cache_service import CacheService
+from opinion_builder.websocket.consumer import OpinionWebSocketConsumer, _market_frames
+
+
+def _fast_retry_consumer(url: str) -> OpinionWebSocketConsumer:
+    """Consumer with reconnect delays short enough for tests."""
+    consumer = OpinionWebSocketConsumer(api_key="test", url=url, heartbeat_interval=30)
+    consumer._min_reconnect_delay = 0.01
+    consumer._reconnect_delay = 0.01
+    consumer._max_reconnect_delay = 0.05
+    return consumer
+
+
+async def test_refused_connection_keeps_retrying() -> None:
+    consumer = _fast_retry_consumer("ws://127.0.0.1:1")
+    attempts = 0
+    connect = consumer._connect
+
+    async def counting_connect() -> None:
+        nonlocal attempts
+        attempts += 1
+        await connect()
+
+    consumer._connect = counting_connect  # type: ignore[method-assign]
+    await consumer.start()
+    try:
+        await asyncio.sleep(0.5)
+        assert attempts >= 3
+        assert consumer._running
+        assert not consumer.is_connected
+        assert consumer._reconnect_delay <= consumer._max_reconnect_delay
+    finally:
+        await consumer.stop()
+    assert consumer._connect_task is None
+
+
+async def test_stop_wakes_pending_reconnect_wait() -> None:
+    consumer = _fast_retry_consumer("ws://127.0.0.1:1")
+    consumer._min_reconnect_delay = 30
+    consumer._reconnect_delay = 30
+    consumer._max_reconnect_delay = 60
+    await consumer.start()
+    await asyncio.sleep(0.2)
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await consumer.stop()
+    assert loop.time() - started < 1
+
+
+class _PongTimeoutApp:
+    """WebSocketApp stand-in whose connection opens and then misses a pong."""
+
+    instances: list["_PongTimeoutApp"] = []
+
+    def __init__(self, url: str, on_message, on_error, on_close, on_open) -> None:
+        self.on_error = on_error
+        self.on_close = on_close
+        self.on_open = on_open
+        self.sent: list[bytes | str] = []
+        self.run_kwargs: dict = {}
+        _PongTimeoutApp.instances.append(self)
+
+    def run_forever(self, **kwargs) -> bool:
+        self.run_kwargs = kwargs
+        self.on_open(self)
+        self.on_error(self, websocket.WebSocketTimeoutException("ping/pong timed out"))
+        self.on_close(self, None, None)
+        return True
+
+    def send(self, data: bytes | str) -> None:
+        self.sent.append(data)
+
+    def close(self) -> None:
+        pass
+
+
+async def test_ping_timeout_reconnects_and_resubscribes(
+    monkeypatch: pytest.MonkeyPatch, topic_cache: CacheService
+) -> None:
+    await topic_cache.initialize_topics(
+        [Topic(id="42", market_id=42, question="Will it rain?", outcome_type="binary")]
+    )
+    _PongTimeoutApp.instances = []
+    monkeypatch.setattr(websocket, "WebSocketApp", _PongTimeoutApp)
+
+    consumer = _fast_retry_consumer("ws://opinion.test")
+    await consumer.start()
+    try:
+        await asyncio.sleep(0.3)
+    finally:
+        await consumer.stop()
+
+    apps = _PongTimeoutApp.instances
+    assert len(apps) >= 2
+    for app in apps:
+        assert app.run_kwargs["ping_timeout"] < app.run_kwargs["ping_interval"]
+        assert b'{"action":"SUBSCRIBE","channel":"market.last.price","marketId":42}' in app.sent
+
+
+def test_full_inbox_logs_once_per_overflow(caplog: pytest.LogCaptureFixture) -> None:
+    consumer = OpinionWebSocketConsumer(api_key="test", url="ws://unused")
+    capacity = consumer._inbox.maxlen or 0
+
+    with caplog.at_level(logging.WARNING, logger="opinion_builder.websocket.consumer"):
+        for i in range(capacity + 50):
+            consumer._on_message(None, b"%d" % i)  # type: ignore[arg-type]
+        assert len(caplog.records) == 1
+        assert consumer._inbox[0] == b"50"
+
+        consumer._inbox.popleft()
+        consumer._on_message(None, b"next")  # type: ignore[arg-type]
+    assert len(caplog.records) == 2
+    assert "dropped 50 messages" in caplog.records[1].getMessage()
+
+
+@pytest.mark.parametrize("market_id", [0, 7, 123456789])
+def test_subscribe_frames_match_encoded_messages(market_id: int) -> None:
+    channels = ("market.last.price", "market.depth.diff", "market.last.trade")
+    assert _market_frames(market_id, "binary") == tuple(
+        msgspec.json.encode(WebSocketSubscribeMessage("SUBSCRIBE", channel, market_id=market_id))
+        for channel in channels
+    )
+    assert _market_frames(market_id, "categorical") == (
+        msgspec.json.encode(
+            WebSocketSubscribeMessage("SUBSCRIBE", channels[0], root_market_id=market_id)
+        ),
+    )
+
+
+async def test_consume_yields_between_batches() -> None:
+    consumer = OpinionWebSocketConsumer(api_key="test", url="ws://unused")
+    backlog = 1000
+    consumer._inbox.extend(
+        b'{"msgType":"market.last.price","marketId":1,"price":"0.5","outcomeSide":1}'
+        for _ in range(backlog)
+    )
+    consumer._inbox_ready.set()
+    task = asyncio.create_task(consumer._consume())
+    try:
+        # Runs as soon as the consumer yields, which must be before the inbox is empty
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert 0 < len(consumer._inbox) < backlog
+    finally:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
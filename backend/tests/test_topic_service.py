@@ -0,0 +1,88 @@
+"""Tests for topic listing and pagination."""
+
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from opinion_builder.models.topic import Topic
+from opinion_builder.services.cache_service import CacheService
+from opinion_builder.services.topic_service import TopicService
+
+BASE_DATE = datetime(2025, 1, 1, tzinfo=UTC)
+
+
+@pytest.fixture
+async def service(topic_cache: CacheService) -> TopicService:
+    # Few distinct end dates so pages split ties, some topics without end date
+    topics = [
+        Topic(
+            id=str(market_id),
+            market_id=market_id,
+            question=f"Question {market_id}",
+            outcome_type="binary",
+            end_date=None if market_id % 11 == 0 else BASE_DATE + timedelta(days=market_id % 7),
+        )
+        for market_id in range(200, 0, -1)
+    ]
+    await topic_cache.initialize_topics(topics)
+    return TopicService(None)  # type: ignore[arg-type]
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+@pytest.mark.parametrize(
+    ("after_days", "before_days"), [(None, None), (2, None), (None, 4), (1, 5)]
+)
+async def test_offset_then_keyset_pages_walk_every_topic_once(
+    service: TopicService,
+    topic_cache: CacheService,
+    order: str,
+    after_days: int | None,
+    before_days: int | None,
+) -> None:
+    bounds = {
+        "end_date_after": None if after_days is None else BASE_DATE + timedelta(days=after_days),
+        "end_date_before": None if before_days is None else BASE_DATE + timedelta(days=before_days),
+    }
+    after, before = bounds["end_date_after"], bounds["end_date_before"]
+    expected = sorted(
+        (
+            t
+            for t in topic_cache.get_snapshot()
+            if (after is None or (t.end_date and t.end_date >= after))
+            and (before is None or (t.end_date and t.end_date <= before))
+        ),
+        key=lambda t: (t.end_date is not None, t.end_date or BASE_DATE, t.market_id),
+        reverse=order == "desc",
+    )
+    expected_total = len(expected)
+
+    page, total = await service.get_topics(limit=7, order_by="end_date", order=order, **bounds)
+    assert total == expected_total
+    walked = list(page)
+    while page:
+        last = walked[-1]
+        page, total = await service.get_topics(
+            limit=7,
+            order_by="end_date",
+            order=order,
+            after_end_date=last.end_date,
+            after_id=last.id,
+            **bounds,
+        )
+        assert total == expected_total
+        walked.extend(page)
+
+    assert [t.market_id for t in walked] == [t.market_id for t in expected]
+
+
+def test_parsed_datetimes_are_aware_utc() -> None:
+    service = TopicService(None)  # type: ignore[arg-type]
+    expected = datetime(2025, 1, 2, tzinfo=UTC)
+
+    assert service._parse_datetime("2025-01-02T00:00:00Z") == expected
+    assert service._parse_datetime("2025-01-02T00:00:00") == expected
+    assert service._parse_datetime("2025-01-02T01:00:00+01:00") == expected
+    assert all(
+        service._parse_datetime(value).tzinfo is UTC  # type: ignore[union-attr]
+        for value in ("2025-01-02T00:00:00", "2025-01-02T01:00:00+01:00")
+    )